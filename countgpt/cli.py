@@ -1,23 +1,69 @@
 """Command line interface for counting tokens in text files."""
+import os
 import sys
 import click
-import tiktoken
 from pathlib import Path
-from typing import List, Dict, Union, Optional, TextIO
+from typing import List, Dict, Sequence, Union, Optional, TextIO
 from .models import (
+    DEFAULT_MODEL,
+    FileCount,
     count_tokens, 
     count_tokens_in_file, 
-    get_available_models, 
-    get_supported_llm_models,
-    get_encoding_for_model
+    count_tokens_in_files,
+    get_encoding,
+    get_encoding_for_model,
+    iter_text_chunks,
+    render_model_listing
 )
-from .visualize import colorize_file, visualize_tokens
+from .visualize import colorize_file, decode_token_bytes, visualize_tokens
+
+
+def _count_files(files: Sequence[str], encoding_name: str) -> List[Union[FileCount, Exception]]:
+    """Count tokens in files, streaming them and encoding their chunks in shared batches.
+    
+    If some file can't be counted, the files are counted again one at a time
+    so that only the failing ones are lost.
+    
+    Returns:
+        The count of each file, or the error it raised, in the same order
+    """
+    try:
+        return list(count_tokens_in_files(list(files), encoding_name))
+    except (OSError, ValueError):
+        pass
+    
+    results: List[Union[FileCount, Exception]] = []
+    for file_path in files:
+        try:
+            results.append(count_tokens_in_file(file_path, encoding_name))
+        except (OSError, ValueError) as e:
+            results.append(e)
+    return results
+
+
+def _read_error(path: Union[str, Path], error: Exception) -> str:
+    """Return the message reported for a file that could not be read."""
+    if isinstance(error, UnicodeDecodeError):
+        return f"Error reading {path}: Could not decode file. Please ensure it is valid UTF-8: {str(error)}"
+    if isinstance(error, PermissionError):
+        return f"Error reading {path}: Permission denied: {str(error)}"
+    return f"Error reading {path}: {str(error)}"
+
+
+def _verbose_report(header: str, model_line: str, token_count: int, char_count: int) -> List[str]:
+    """Return the lines of the verbose report for one input, to be written in a single echo."""
+    return [
+        header,
+        model_line,
+        f"  Token count: {token_count}",
+        f"  Character count: {char_count}",
+    ]
 
 
 @click.command()
 @click.argument('files', nargs=-1, type=click.Path(exists=True, readable=True), required=False)
-@click.option('--model', '-m', default='cl100k_base', 
-              help='Tokenizer model or LLM model name. Default: cl100k_base')
+@click.option('--model', '-m', default=DEFAULT_MODEL, 
+              help=f'Tokenizer model or LLM model name. Default: {DEFAULT_MODEL}')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed information')
 @click.option('--list-models', '-l', is_flag=True, help='List all supported models and exit')
 @click.option('--visualize', '-c', is_flag=True, help='Visualize tokens with colorful output')
@@ -35,62 +81,45 @@ def main(files, model, verbose, list_models, visualize) -> None:
         echo "Hello world" | countgpt
     """
     if list_models:
-        # Display tokenizer models
-        click.echo("Available tokenizer models:")
-        for enc_model in sorted(get_available_models()):
-            click.echo(f"  {enc_model}")
-        
-        # Get all models and sort them
-        all_models = get_supported_llm_models()
-        
-        # Display Anthropic models
-        click.echo("\nAnthropic Models:")
-        anthropic_models = [m for m in all_models if m.startswith(("claude", "o1", "o3")) or m in ["opus", "sonnet", "haiku"]]
-        for llm_model in sorted(anthropic_models):
-            encoding = get_encoding_for_model(llm_model)
-            click.echo(f"  {llm_model} (uses {encoding})")
-        
-        # Display OpenAI models
-        click.echo("\nOpenAI Models:")
-        openai_models = [m for m in all_models if m.startswith(("gpt", "text-", "davinci", "babbage", "curie", "ada", "4", "3.5")) and m not in ["gpt2", "gpt-2"]]
-        for llm_model in sorted(openai_models):
-            encoding = get_encoding_for_model(llm_model)
-            click.echo(f"  {llm_model} (uses {encoding})")
-        
-        # Display shorthands
-        click.echo("\nShorthands:")
-        shorthand_models = ["4o", "4", "3.5", "opus", "sonnet", "haiku", "chatgpt", "claude"]
-        for llm_model in shorthand_models:
-            if llm_model in all_models:
-                encoding = get_encoding_for_model(llm_model)
-                click.echo(f"  {llm_model} (uses {encoding})")
-        
-        # Display other models
-        other_models = [m for m in all_models if m not in anthropic_models and m not in openai_models and m not in shorthand_models]
-        if other_models:
-            click.echo("\nOther Models:")
-            for llm_model in sorted(other_models):
-                encoding = get_encoding_for_model(llm_model)
-                click.echo(f"  {llm_model} (uses {encoding})")
-        
+        click.echo(render_model_listing())
         return
     
     # Get the correct encoding based on model input (could be LLM name or encoding)
     try:
         encoding_name = get_encoding_for_model(model)
-        encoding = tiktoken.get_encoding(encoding_name)
-    except KeyError:
+        # Only visualization needs the tiktoken encoding itself; counting goes
+        # through count_tokens, which may use a faster backend
+        if visualize:
+            encoding = get_encoding(encoding_name)
+    except (KeyError, ValueError):
         click.echo(f"Error: Model '{model}' not found.", err=True)
         click.echo(f"Use --list-models to see available options.", err=True)
         sys.exit(1)
     
+    if model != encoding_name:
+        model_line: str = f"  Model: {model} (using {encoding_name} tokenizer)"
+    else:
+        model_line = f"  Model: {model}"
+    
     # Check if we're getting data from pipe or files
     if not files and not sys.stdin.isatty():
         # Read from stdin (pipe)
+        content: str = ""
+        tokens: List[int] = []
+        token_count: int = 0
+        char_count: int = 0
         try:
-            content: str = sys.stdin.read()
-            tokens: List[int] = encoding.encode(content)
-            token_count: int = len(tokens)
+            if visualize:
+                # Visualization needs the whole input at once
+                content = sys.stdin.read()
+                tokens = encoding.encode_ordinary(content)
+                token_count = len(tokens)
+                char_count = len(content)
+            else:
+                # Tokenize the stream chunk by chunk rather than buffering it whole
+                for chunk in iter_text_chunks(sys.stdin.buffer):
+                    token_count += count_tokens(chunk, encoding_name)
+                    char_count += len(chunk)
         except UnicodeDecodeError as e:
             click.echo(f"Error: Could not decode input. Please ensure it is valid UTF-8: {str(e)}", err=True)
             sys.exit(1)
@@ -101,63 +130,73 @@ def main(files, model, verbose, list_models, visualize) -> None:
         if visualize:
             # Show colorful visualization of tokens
             try:
-                token_bytes: List[bytes] = [encoding.decode_single_token_bytes(token) for token in tokens]
+                token_bytes: List[bytes] = decode_token_bytes(encoding, tokens)
                 visualize_tokens(content, token_bytes)
             except Exception as e:
                 click.echo(f"Error visualizing tokens: {str(e)}", err=True)
         elif verbose:
-            click.echo(f"Stdin (piped input):")
-            if model != encoding_name:
-                click.echo(f"  Model: {model} (using {encoding_name} tokenizer)")
-            else:
-                click.echo(f"  Model: {model}")
-            click.echo(f"  Token count: {token_count}")
-            click.echo(f"  Character count: {len(content)}")
+            click.echo("\n".join(_verbose_report("Stdin (piped input):", model_line, token_count, char_count)))
         else:
-            click.echo(f"{token_count}")
+            click.echo(str(token_count))
     
-    elif files:
-        # Read from files
-        total_tokens: int = 0
+    elif files and visualize:
+        # Visualization needs the whole text of each file, so read them all first
+        paths: List[Path] = []
+        contents: List[str] = []
         
         for file_path in files:
             path = Path(file_path)
             try:
-                content: str = path.read_text(encoding='utf-8')
-                tokens: List[int] = encoding.encode(content)
-                token_count: int = len(tokens)
-                total_tokens += token_count
-                
-                if visualize:
-                    # Show colorful visualization of tokens
-                    click.echo(f"\n{path}:")
-                    try:
-                        token_bytes: List[bytes] = [encoding.decode_single_token_bytes(token) for token in tokens]
-                        visualize_tokens(content, token_bytes)
-                    except Exception as e:
-                        click.echo(f"Error visualizing tokens: {str(e)}", err=True)
-                elif verbose:
-                    click.echo(f"{path}:")
-                    if model != encoding_name:
-                        click.echo(f"  Model: {model} (using {encoding_name} tokenizer)")
-                    else:
-                        click.echo(f"  Model: {model}")
-                    click.echo(f"  Token count: {token_count}")
-                    click.echo(f"  Character count: {len(content)}")
-                else:
-                    click.echo(f"{path}: {token_count}")
-            except UnicodeDecodeError as e:
-                click.echo(f"Error reading {path}: Could not decode file. Please ensure it is valid UTF-8: {str(e)}", err=True)
-            except PermissionError as e:
-                click.echo(f"Error reading {path}: Permission denied: {str(e)}", err=True)
+                # Decode the raw bytes directly: skips the text layer and its newline translation
+                contents.append(path.read_bytes().decode('utf-8'))
+                paths.append(path)
+            except Exception as e:
+                click.echo(_read_error(path, e), err=True)
+        
+        try:
+            # Visualization needs the tokens themselves, not just their counts
+            num_threads: int = max(1, min(len(contents), os.cpu_count() or 1))
+            token_lists: List[List[int]] = encoding.encode_ordinary_batch(contents, num_threads=num_threads)
+        except Exception as e:
+            click.echo(f"Error processing files: {str(e)}", err=True)
+            sys.exit(1)
+        
+        for path, content, file_tokens in zip(paths, contents, token_lists):
+            # Show colorful visualization of tokens
+            click.echo(f"\n{path}:")
+            try:
+                visualize_tokens(content, decode_token_bytes(encoding, file_tokens))
             except Exception as e:
-                click.echo(f"Error reading {path}: {str(e)}", err=True)
+                click.echo(f"Error visualizing tokens: {str(e)}", err=True)
+    
+    elif files:
+        # Collect the per-file report and write it in as few echoes as possible
+        lines: List[str] = []
+        total_tokens: int = 0
         
-        if len(files) > 1 and not visualize:
+        for file_path, result in zip(files, _count_files(files, encoding_name)):
+            if isinstance(result, Exception):
+                # Write out the report so far first, so errors show up in file order
+                if lines:
+                    click.echo("\n".join(lines))
+                    lines = []
+                click.echo(_read_error(file_path, result), err=True)
+                continue
+            
+            total_tokens += result.tokens
             if verbose:
-                click.echo(f"Total tokens across all files: {total_tokens}")
+                lines.extend(_verbose_report(f"{result.file}:", model_line, result.tokens, result.characters))
             else:
-                click.echo(f"Total: {total_tokens}")
+                lines.append(f"{result.file}: {result.tokens}")
+        
+        if len(files) > 1:
+            if verbose:
+                lines.append(f"Total tokens across all files: {total_tokens}")
+            else:
+                lines.append(f"Total: {total_tokens}")
+        
+        if lines:
+            click.echo("\n".join(lines))
     
     else:
         # No files and no pipe, show help
@@ -1,8 +1,43 @@
 """Token counting functionality for CountGPT."""
+import functools
+import mmap
+import os
+import re
+import stat
 import sys
-import tiktoken
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Union, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterator, List, Dict, NamedTuple, Tuple, Union, Optional, cast
+
+if TYPE_CHECKING:
+    import tiktoken
+
+# tiktoken is imported inside the functions that need it, so that --help and
+# --list-models don't pay for loading its Rust extension
+
+
+# Model used when none is given; counting with it skips the model name lookup
+DEFAULT_MODEL: str = "cl100k_base"
+
+# Number of bytes read at a time when tokenizing a stream
+CHUNK_SIZE: int = 1 << 20
+
+# Token counts of texts shorter than this many characters are memoized
+CACHED_TEXT_LIMIT: int = 4096
+
+# Texts at least this many characters long are split and encoded on several threads
+PARALLEL_THRESHOLD: int = 4 * 1024 * 1024
+
+# Files at least this many bytes long are memory-mapped instead of read
+MMAP_THRESHOLD: int = 64 * 1024
+
+# Number of file chunks handed to the encoder in a single batch
+BATCH_CHUNKS: int = 64
+
+# Number of file token counts remembered between calls
+FILE_CACHE_SIZE: int = 256
 
 
 # Model name to encoding mappings
@@ -103,17 +138,145 @@ MODEL_TO_ENCODING: Dict[str, str] = {
     "gpt-2": "gpt2",  # Maintains consistency with gpt-4
 }
 
+# Matches the longest model name prefix in MODEL_PREFIX_TO_ENCODING
+_PREFIX_RE = re.compile("|".join(
+    sorted(map(re.escape, MODEL_PREFIX_TO_ENCODING), key=len, reverse=True)
+))
+
+# All supported model names, sorted once at import time
+_SORTED_MODELS: Tuple[str, ...] = tuple(sorted(MODEL_TO_ENCODING))
+
+# Model names grouped for --list-models, filtered from the sorted names so they stay sorted
+ANTHROPIC_MODELS: Tuple[str, ...] = tuple(
+    m for m in _SORTED_MODELS
+    if m.startswith(("claude", "o1", "o3")) or m in ("opus", "sonnet", "haiku")
+)
+OPENAI_MODELS: Tuple[str, ...] = tuple(
+    m for m in _SORTED_MODELS
+    if m.startswith(("gpt", "text-", "davinci", "babbage", "curie", "ada", "4", "3.5")) and m not in ("gpt2", "gpt-2")
+)
+SHORTHAND_MODELS: Tuple[str, ...] = tuple(
+    m for m in ("4o", "4", "3.5", "opus", "sonnet", "haiku", "chatgpt", "claude") if m in MODEL_TO_ENCODING
+)
+OTHER_MODELS: Tuple[str, ...] = tuple(
+    m for m in _SORTED_MODELS
+    if m not in ANTHROPIC_MODELS and m not in OPENAI_MODELS and m not in SHORTHAND_MODELS
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(encoding_name: str) -> "tiktoken.Encoding":
+    """Return the tiktoken encoding with the given name.
+    
+    Encodings are loaded once and kept for the lifetime of the process.
+    tiktoken keeps its own hash-checked copy of the vocabulary files on disk.
+    
+    Args:
+        encoding_name: Name of the tiktoken encoding, e.g. cl100k_base
+        
+    Returns:
+        The tiktoken encoding
+    
+    Raises:
+        ValueError: If the encoding name is unknown
+    """
+    import tiktoken
+    
+    return tiktoken.get_encoding(encoding_name)
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding_names() -> Tuple[str, ...]:
+    """Return the sorted names of all tiktoken encodings, looked up once per process."""
+    import tiktoken
+    
+    return tuple(sorted(tiktoken.list_encoding_names()))
+
+
+class _BpeOpenAIEncoder:
+    """Adapter exposing the bpe-openai Rust tokenizer through tiktoken's encoding API."""
+    
+    def __init__(self, tokenizer: Any) -> None:
+        self._tokenizer = tokenizer
+    
+    def encode_ordinary(self, text: str) -> List[int]:
+        return cast(List[int], self._tokenizer.encode(text))
+    
+    def count_ordinary(self, text: str) -> int:
+        return int(self._tokenizer.count(text))
+
+
+def _load_bpe_openai(encoding_name: str) -> Optional[_BpeOpenAIEncoder]:
+    """Return a bpe-openai encoder, or None if the optional extension isn't installed."""
+    try:
+        from bpe_openai import _bindings
+    except ImportError:
+        return None
+    return _BpeOpenAIEncoder(_bindings.tokenizer_for_encoding(encoding_name))
+
+
+# Faster alternative backends for counting tokens, keyed by encoding name. Each
+# returns None when it can't be used, in which case tiktoken is used instead.
+_ENCODER_BACKENDS: Dict[str, Callable[[str], Optional[Any]]] = {
+    "cl100k_base": _load_bpe_openai,
+    "o200k_base": _load_bpe_openai,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _get_counting_encoder(encoding_name: str) -> Any:
+    """Return the fastest available encoder for counting tokens with an encoding.
+    
+    Raises:
+        ValueError: If the encoding name is unknown
+    """
+    backend = _ENCODER_BACKENDS.get(encoding_name)
+    if backend is not None:
+        try:
+            encoder = backend(encoding_name)
+        except Exception:
+            encoder = None
+        if encoder is not None:
+            return encoder
+    return get_encoding(encoding_name)
+
 
 def get_available_models() -> List[str]:
     """Return a list of available tiktoken models."""
-    return tiktoken.list_encoding_names()
+    return list(_encoding_names())
 
 
 def get_supported_llm_models() -> List[str]:
     """Return a list of supported LLM model names that can be used."""
-    return sorted(MODEL_TO_ENCODING.keys())
+    return list(_SORTED_MODELS)
+
+
+@functools.lru_cache(maxsize=1)
+def render_model_listing() -> str:
+    """Return the --list-models text, built once per process.
+    
+    Returns:
+        The tokenizer models followed by the LLM models grouped by provider,
+        shorthands and everything else, with the encoding each one uses
+    """
+    lines: List[str] = ["Available tokenizer models:"]
+    lines.extend(f"  {enc_model}" for enc_model in _encoding_names())
+    
+    sections = [
+        ("Anthropic Models", ANTHROPIC_MODELS),
+        ("OpenAI Models", OPENAI_MODELS),
+        ("Shorthands", SHORTHAND_MODELS),
+        ("Other Models", OTHER_MODELS),
+    ]
+    for title, section_models in sections:
+        if section_models:
+            lines.append(f"\n{title}:")
+            lines.extend(f"  {llm_model} (uses {MODEL_TO_ENCODING[llm_model]})" for llm_model in section_models)
+    
+    return "\n".join(lines)
 
 
+@functools.lru_cache(maxsize=256)
 def get_encoding_for_model(model_name: str) -> str:
     """Get the appropriate tiktoken encoding for a given model name.
     
@@ -131,26 +294,249 @@ def get_encoding_for_model(model_name: str) -> str:
         return MODEL_TO_ENCODING[model_name]
     
     # Check if it starts with any prefix in MODEL_PREFIX_TO_ENCODING
-    for prefix, encoding in MODEL_PREFIX_TO_ENCODING.items():
-        if model_name.startswith(prefix):
-            return encoding
+    match = _PREFIX_RE.match(model_name)
+    if match:
+        return MODEL_PREFIX_TO_ENCODING[match.group(0)]
     
     # If it's a tiktoken encoding name, use it directly
-    if model_name in get_available_models():
+    if model_name in _encoding_names():
         return model_name
     
-    # If we reach here, we need to check if it's an unknown model
-    # Let's provide a more informative message about the unknown model,
-    # but still default to cl100k_base as a fallback
-    if not model_name.startswith(tuple(MODEL_PREFIX_TO_ENCODING.keys())) and model_name not in tiktoken.list_encoding_names():
-        print(f"Warning: Unknown model '{model_name}'. Defaulting to cl100k_base encoding.", file=sys.stderr)
-        
+    # If we reach here the model is unknown: say so, but still default to
+    # cl100k_base as a fallback
+    print(f"Warning: Unknown model '{model_name}'. Defaulting to cl100k_base encoding.", file=sys.stderr)
     return "cl100k_base"
 
 
-def count_tokens(content: str, model: str = 'cl100k_base') -> int:
+# ASCII letters and digits, the only neighbours a newline is split between
+_ALNUM_BYTES = frozenset(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+
+def _last_safe_break(data: Union[bytes, bytearray, mmap.mmap], start: int = 1, end: Optional[int] = None) -> int:
+    """Find the last position at which text can be split without changing its tokens.
+    
+    A newline between two ASCII letters or digits never shares a pre-token
+    with its neighbours in any tiktoken encoding: word and number pre-tokens
+    stop at a newline and can't start with one, so the text on either side
+    of it tokenizes exactly as it would unsplit. Punctuation is not safe, as
+    o200k_base's punctuation pre-token swallows the newlines and slashes that
+    follow it ("}\n//" is a single pre-token there). ASCII bytes never occur
+    inside a multi-byte UTF-8 sequence, so both sides are also valid UTF-8
+    without any codepoint boundary scan.
+
+    Args:
+        data: UTF-8 encoded text
+        start: Offset from which to look for newlines
+        end: Offset at which to stop looking (default: the end of data)
+        
+    Returns:
+        The offset just past the last safe newline, or -1 if there is none
+    """
+    start = max(start, 1)
+    if end is None:
+        end = len(data)
+    index: int = data.rfind(b"\n", start, end - 1)
+    while index != -1:
+        if data[index - 1] in _ALNUM_BYTES and data[index + 1] in _ALNUM_BYTES:
+            return index + 1
+        index = data.rfind(b"\n", start, index)
+    return -1
+
+
+def iter_text_chunks(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Decode a binary stream into pieces of text that can be tokenized independently.
+    
+    The token counts of the yielded pieces add up to the token count of the
+    whole stream, while only about chunk_size bytes are held in memory at once
+    (unless the input has no safe split point for longer than that).
+    
+    Args:
+        stream: Binary stream of UTF-8 encoded text
+        chunk_size: Number of bytes to read at a time
+        
+    Yields:
+        Consecutive pieces of the decoded text
+        
+    Raises:
+        UnicodeDecodeError: If the stream contains invalid UTF-8
+    """
+    pending = bytearray()
+    while True:
+        block: bytes = stream.read(chunk_size)
+        if not block:
+            break
+        # Earlier newlines have already been ruled out; only the last byte lacked a right neighbour
+        scan_from: int = len(pending) - 1
+        pending += block
+        split: int = _last_safe_break(pending, scan_from)
+        if split != -1:
+            yield pending[:split].decode('utf-8')
+            del pending[:split]
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def _iter_buffer_chunks(buffer: Union[bytes, mmap.mmap], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Decode an in-memory or memory-mapped buffer into pieces of text that can be tokenized independently.
+    
+    Like iter_text_chunks, but each piece is decoded straight from the
+    buffer, so the bytes are never copied out of a memory map first.
+    
+    Args:
+        buffer: UTF-8 encoded text
+        chunk_size: Approximate number of bytes in each piece
+        
+    Yields:
+        Consecutive pieces of the decoded text
+        
+    Raises:
+        UnicodeDecodeError: If the buffer contains invalid UTF-8
+    """
+    size: int = len(buffer)
+    start: int = 0
+    while size - start > chunk_size:
+        end: int = start + chunk_size
+        split: int = _last_safe_break(buffer, start, end)
+        # Widen the window until it contains a safe split point
+        while split == -1 and end < size:
+            end = min(end + chunk_size, size)
+            split = _last_safe_break(buffer, end - chunk_size - 1, end)
+        if split == -1:
+            break
+        with memoryview(buffer) as view, view[start:split] as piece:
+            text: str = str(piece, 'utf-8')
+        yield text
+        start = split
+    if start < size:
+        with memoryview(buffer) as view, view[start:] as piece:
+            text = str(piece, 'utf-8')
+        yield text
+
+
+def _iter_file_chunks(f: BinaryIO) -> Iterator[str]:
+    """Decode an open binary file into pieces of text that can be tokenized independently.
+    
+    Files of at least MMAP_THRESHOLD bytes are memory-mapped and decoded in
+    place; smaller ones are simply read, as mapping them costs more than it saves.
+    """
+    if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+        yield from iter_text_chunks(f)
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield from _iter_buffer_chunks(mm)
+
+
+# A newline that can be split on without changing tokens, see _last_safe_break
+_SAFE_BREAK_RE = re.compile(r"(?<=[A-Za-z0-9])\n(?=[A-Za-z0-9])")
+
+
+def _split_text(text: str, parts: int) -> List[str]:
+    """Split text into at most the given number of pieces that tokenize independently.
+    
+    Pieces are cut at the first safe newline after each evenly spaced offset,
+    so their token counts add up to the token count of the whole text.
+    
+    Args:
+        text: The text to split
+        parts: The number of pieces to aim for
+        
+    Returns:
+        Consecutive pieces of the text
+    """
+    pieces: List[str] = []
+    start: int = 0
+    step: int = len(text) // parts
+    for i in range(1, parts):
+        match = _SAFE_BREAK_RE.search(text, max(start, i * step))
+        if match is None:
+            break
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+@functools.lru_cache(maxsize=1)
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the thread pool shared by all parallel encoding, creating it on first use.
+    
+    The encoders release the GIL while encoding, so one thread per CPU core
+    runs them in parallel without paying for a new pool on every call.
+    """
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="countgpt")
+
+
+def _counter(encoding: Any) -> Callable[[str], int]:
+    """Return a function counting the tokens in a text with an encoding.
+    
+    Uses the encoding's native count_ordinary where it has one, so the token
+    list is never built. Otherwise only the length of the encoded list is
+    kept, and the list itself is freed straight away.
+    """
+    count_ordinary = getattr(encoding, "count_ordinary", None)
+    if count_ordinary is not None:
+        return cast(Callable[[str], int], count_ordinary)
+    encode = encoding.encode_ordinary
+    return lambda text: len(encode(text))
+
+
+def _count_texts(encoding: Any, texts: List[str]) -> List[int]:
+    """Count tokens in each text, spreading the work over one thread per CPU core.
+    
+    Texts of at least PARALLEL_THRESHOLD characters are split first, so that
+    a single large input is encoded in parallel too.
+    """
+    num_threads: int = os.cpu_count() or 1
+    pieces: List[str] = []
+    owners: List[int] = []
+    for index, text in enumerate(texts):
+        if num_threads > 1 and len(text) >= PARALLEL_THRESHOLD:
+            chunks = _split_text(text, num_threads)
+        else:
+            chunks = [text]
+        pieces.extend(chunks)
+        owners.extend([index] * len(chunks))
+    
+    count = _counter(encoding)
+    if len(pieces) == 1:
+        return [count(pieces[0])]
+    
+    counts: List[int] = [0] * len(texts)
+    for owner, piece_count in zip(owners, _get_executor().map(count, pieces)):
+        counts[owner] += piece_count
+    return counts
+
+
+def _counting_encoder_for_model(model: str) -> Any:
+    """Return the counting encoder for a model name, rejecting unknown models.
+    
+    Raises:
+        ValueError: If the model is not found
+    """
+    if model == DEFAULT_MODEL:
+        return _get_counting_encoder(DEFAULT_MODEL)
+    if model in MODEL_TO_ENCODING or _PREFIX_RE.match(model) or model in _encoding_names():
+        try:
+            return _get_counting_encoder(get_encoding_for_model(model))
+        except (KeyError, ValueError):
+            pass
+    available = ", ".join(get_available_models())
+    raise ValueError(f"Model '{model}' not found. Available models: {available}")
+
+
+@functools.lru_cache(maxsize=1024)
+def _count_cached(model: str, content: str) -> int:
+    """Count tokens in a short string, remembering the result."""
+    return _count_texts(_counting_encoder_for_model(model), [content])[0]
+
+
+def count_tokens(content: str, model: str = DEFAULT_MODEL) -> int:
     """Count tokens in a string using the specified model.
     
+    Counts for strings shorter than CACHED_TEXT_LIMIT are memoized, so
+    repeated calls with the same short text are answered from memory. Use
+    count_tokens.cache_clear() to drop them.
+    
     Args:
         content: The text content to count tokens in
         model: The tiktoken model or LLM model name to use for tokenization
@@ -161,18 +547,151 @@ def count_tokens(content: str, model: str = 'cl100k_base') -> int:
     Raises:
         ValueError: If the model is not found
     """
+    if len(content) < CACHED_TEXT_LIMIT:
+        return _count_cached(model, content)
+    
+    # Convert LLM model name to encoding if needed
+    encoding = _counting_encoder_for_model(model)
+    return _count_texts(encoding, [content])[0]
+
+
+count_tokens.cache_clear = _count_cached.cache_clear  # type: ignore[attr-defined]
+
+
+def count_tokens_batch(contents: List[str], model: str = DEFAULT_MODEL) -> List[int]:
+    """Count tokens in several strings at once, encoding them in parallel.
+    
+    Args:
+        contents: The text contents to count tokens in
+        model: The tiktoken model or LLM model name to use for tokenization
+        
+    Returns:
+        The number of tokens in each content, in the same order
+    
+    Raises:
+        ValueError: If the model is not found
+    """
+    encoding = _counting_encoder_for_model(model)
+    return _count_texts(encoding, contents)
+
+
+def count_tokens_bytes(data: bytes, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens in UTF-8 encoded bytes using the specified model.
+    
+    Args:
+        data: The UTF-8 encoded text to count tokens in
+        model: The tiktoken model or LLM model name to use for tokenization
+        
+    Returns:
+        The number of tokens in the data
+    
+    Raises:
+        UnicodeDecodeError: If the data is not valid UTF-8
+        ValueError: If the model is not found
+    """
+    # ASCII is valid UTF-8, so mid-sized ASCII data can go to the encoder as bytes
+    # without being decoded first. Short texts still go through the memoized path
+    # and long ones through the parallel one.
+    if CACHED_TEXT_LIMIT <= len(data) < PARALLEL_THRESHOLD and data.isascii():
+        encode_bytes = getattr(_counting_encoder_for_model(model), "_encode_bytes", None)
+        if encode_bytes is not None:
+            return len(encode_bytes(data))
+    return count_tokens(data.decode('utf-8'), model)
+
+
+def _stat_file(file_path: Union[str, Path]) -> Tuple[str, os.stat_result]:
+    """Return the path of an existing regular file as a string, along with its status.
+    
+    Uses os.fspath and os.stat rather than building a Path, so a file costs
+    a single stat call.
+    
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the path is not a file
+    """
+    path: str = os.fspath(file_path)
     try:
-        # Convert LLM model name to encoding if needed
-        encoding_name = get_encoding_for_model(model)
-        encoding = tiktoken.get_encoding(encoding_name)
-        tokens = encoding.encode(content)
-        return len(tokens)
-    except KeyError:
-        available = ", ".join(get_available_models())
-        raise ValueError(f"Model '{model}' not found. Available models: {available}")
+        status: os.stat_result = os.stat(path)
+    except (OSError, ValueError):
+        raise FileNotFoundError(f"File not found: {path}")
+    if not stat.S_ISREG(status.st_mode):
+        raise ValueError(f"Not a file: {path}")
+    return path, status
+
+
+# Token and character counts of recently counted files, keyed by file identity,
+# modification time, size and encoding, least recently used first
+_FILE_CACHE: "OrderedDict[Tuple[int, int, int, int, str], Tuple[int, int]]" = OrderedDict()
+_FILE_CACHE_LOCK = threading.Lock()
 
 
-def count_tokens_in_file(file_path: Union[str, Path], model: str = 'cl100k_base') -> Dict[str, Union[str, int]]:
+def _count_files(encoding: Any, paths: List[str]) -> List[Tuple[int, int]]:
+    """Count tokens and characters in files, batching their chunks together.
+    
+    Files are read chunk by chunk, and up to BATCH_CHUNKS chunks, from one
+    file or several, are encoded in a single parallel batch, so memory stays
+    bounded by the batch size rather than the file sizes.
+    
+    Args:
+        encoding: Encoding providing encode_ordinary or count_ordinary
+        paths: Paths of the files to count
+        
+    Returns:
+        A (tokens, characters) tuple for each file, in the same order
+    """
+    token_counts: List[int] = [0] * len(paths)
+    char_counts: List[int] = [0] * len(paths)
+    pending: List[str] = []
+    owners: List[int] = []
+    
+    def flush() -> None:
+        for owner, count in zip(owners, _count_texts(encoding, pending)):
+            token_counts[owner] += count
+        pending.clear()
+        owners.clear()
+    
+    for index, path in enumerate(paths):
+        try:
+            with open(path, 'rb', buffering=CHUNK_SIZE) as f:
+                for chunk in _iter_file_chunks(f):
+                    pending.append(chunk)
+                    owners.append(index)
+                    char_counts[index] += len(chunk)
+                    if len(pending) >= BATCH_CHUNKS:
+                        flush()
+        except PermissionError as e:
+            raise PermissionError(f"Permission denied when reading {path}: {str(e)}")
+        except UnicodeDecodeError as e:
+            raise UnicodeDecodeError(e.encoding, e.object, e.start, e.end,
+                                     f"Cannot decode file {path}. Ensure it contains valid UTF-8: {e.reason}")
+    if pending:
+        flush()
+    
+    return list(zip(token_counts, char_counts))
+
+
+class FileCount(NamedTuple):
+    """Token and character count of a file.
+    
+    Fields can be read as attributes or by name: result.tokens and
+    result["tokens"] are the same. Any other name raises KeyError.
+    """
+    file: str
+    tokens: int
+    characters: int
+    model: str
+    encoding: str
+    
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, str):
+            # Only field names, not tuple methods such as count or index
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+
+def count_tokens_in_file(file_path: Union[str, Path], model: str = DEFAULT_MODEL) -> FileCount:
     """Count tokens in a file using the specified model.
     
     Args:
@@ -180,7 +699,7 @@ def count_tokens_in_file(file_path: Union[str, Path], model: str = 'cl100k_base'
         model: The tiktoken model or LLM model name to use for tokenization
         
     Returns:
-        A dictionary with token count and character count
+        A FileCount with the token count and character count
         
     Raises:
         FileNotFoundError: If the file does not exist
@@ -188,27 +707,67 @@ def count_tokens_in_file(file_path: Union[str, Path], model: str = 'cl100k_base'
         UnicodeDecodeError: If the file contains invalid UTF-8
         ValueError: If the model is not found
     """
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"File not found: {path}")
-    if not path.is_file():
-        raise ValueError(f"Not a file: {path}")
+    return count_tokens_in_files([file_path], model)[0]
+
+
+def count_tokens_in_files(file_paths: List[Union[str, Path]], model: str = DEFAULT_MODEL) -> List[FileCount]:
+    """Count tokens in several files at once, encoding their chunks in parallel batches.
     
-    try:
-        content = path.read_text(encoding='utf-8')
-    except UnicodeDecodeError as e:
-        raise UnicodeDecodeError(f"Cannot decode file {path}. Ensure it contains valid UTF-8: {str(e)}")
-    except PermissionError as e:
-        raise PermissionError(f"Permission denied when reading {path}: {str(e)}")
+    The counts of the last FILE_CACHE_SIZE files are remembered, keyed by
+    inode, modification time and size, so a file that hasn't changed since
+    it was last counted isn't read again. Use count_tokens_in_files.cache_clear()
+    to drop them.
+    
+    Args:
+        file_paths: Paths to the files to count tokens in
+        model: The tiktoken model or LLM model name to use for tokenization
+        
+    Returns:
+        A FileCount with the token count and character count of each file, in the same order
+        
+    Raises:
+        FileNotFoundError: If a file does not exist
+        PermissionError: If a file cannot be read due to permissions
+        UnicodeDecodeError: If a file contains invalid UTF-8
+        ValueError: If the model is not found
+    """
+    files: List[Tuple[str, os.stat_result]] = [_stat_file(file_path) for file_path in file_paths]
     
     # Convert LLM model name to encoding if needed
+    encoding = _counting_encoder_for_model(model)
     encoding_name: str = get_encoding_for_model(model)
-    token_count: int = count_tokens(content, encoding_name)
-    
-    return {
-        "file": str(path),
-        "tokens": token_count,
-        "characters": len(content),
-        "model": model,
-        "encoding": encoding_name
-    }
\ No newline at end of file
+    
+    # Files unchanged since they were last counted are answered from the cache
+    keys: List[Tuple[int, int, int, int, str]] = [
+        (status.st_dev, status.st_ino, status.st_mtime_ns, status.st_size, encoding_name)
+        for _, status in files
+    ]
+    counts: List[Tuple[int, int]] = [(0, 0)] * len(files)
+    missing: List[int] = []
+    with _FILE_CACHE_LOCK:
+        for index, key in enumerate(keys):
+            cached = _FILE_CACHE.get(key)
+            if cached is None:
+                missing.append(index)
+            else:
+                _FILE_CACHE.move_to_end(key)
+                counts[index] = cached
+    
+    if missing:
+        new_counts = _count_files(encoding, [files[index][0] for index in missing])
+        with _FILE_CACHE_LOCK:
+            for index, file_counts in zip(missing, new_counts):
+                counts[index] = file_counts
+                _FILE_CACHE[keys[index]] = file_counts
+                _FILE_CACHE.move_to_end(keys[index])
+            while len(_FILE_CACHE) > FILE_CACHE_SIZE:
+                _FILE_CACHE.popitem(last=False)
+    
+    return [
+        FileCount(path, token_count, char_count, model, encoding_name)
+        for (path, _), (token_count, char_count) in zip(files, counts)
+    ]
+
+
+count_tokens_in_files.cache_clear = _FILE_CACHE.clear  # type: ignore[attr-defined]
+count_tokens_in_file.cache_clear = _FILE_CACHE.clear  # type: ignore[attr-defined]
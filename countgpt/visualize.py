@@ -1,14 +1,33 @@
 """Token visualization functions for CountGPT."""
 import random
 import sys
-from typing import List, Optional, Tuple, TextIO
+from typing import TYPE_CHECKING, BinaryIO, Iterator, List, Optional, Tuple, TextIO, cast
 
-# ANSI color codes for text background colors (bright versions)
-BG_COLORS = [
-    "\033[48;5;{}m".format(color) for color in 
+if TYPE_CHECKING:
+    import tiktoken
+
+# ANSI color codes for text background colors (bright versions), pre-encoded
+BG_COLORS: Tuple[bytes, ...] = tuple(
+    b"\033[48;5;%dm" % color for color in 
     [153, 184, 214, 209, 183, 157, 156, 147, 146, 218, 222, 229, 193, 157, 122]
-]
-RESET = "\033[0m"
+)
+RESET: bytes = b"\033[0m"
+
+
+def decode_token_bytes(encoding: 'tiktoken.Encoding', tokens: List[int]) -> List[bytes]:
+    """Decode each token into its bytes with a single call where the encoding supports it.
+    
+    Args:
+        encoding: Tiktoken encoding the tokens came from
+        tokens: List of token ids
+        
+    Returns:
+        List of token bytes
+    """
+    decode_tokens_bytes = getattr(encoding, "decode_tokens_bytes", None)
+    if decode_tokens_bytes is not None:
+        return cast(List[bytes], decode_tokens_bytes(tokens))
+    return [encoding.decode_single_token_bytes(token) for token in tokens]
 
 
 def get_token_positions(text: str, tokens: List[bytes]) -> List[Tuple[int, int, str]]:
@@ -32,11 +51,18 @@ def get_token_positions(text: str, tokens: List[bytes]) -> List[Tuple[int, int,
     
     for token in tokens:
         try:
-            token_str: str = token.decode('utf-8', errors='replace')
-            # Find the token in the text starting from the current offset
+            # Most tokens are plain ASCII, which decodes without the UTF-8 state machine
+            token_str: str = token.decode('ascii') if token.isascii() else token.decode('utf-8', errors='replace')
+            # Tokens normally concatenate back to the text, so try the current offset first
+            end: int = offset + len(token_str)
+            if text[offset:end] == token_str:
+                positions.append((offset, end, token_str))
+                offset = end
+                continue
+            # Otherwise search for the token from the current offset
             try:
                 start: int = text.index(token_str, offset)
-                end: int = start + len(token_str)
+                end = start + len(token_str)
                 positions.append((start, end, token_str))
                 offset = end
             except ValueError:
@@ -59,49 +85,78 @@ def get_token_positions(text: str, tokens: List[bytes]) -> List[Tuple[int, int,
     return positions
 
 
-def visualize_tokens(text: str, tokens: List[bytes], output: Optional[TextIO]=sys.stdout) -> None:
-    """Visualize tokens by coloring each token with a different background color.
+def _colored_pieces(text: str, token_positions: List[Tuple[int, int, str]], charset: str) -> Iterator[bytes]:
+    """Yield the encoded pieces of the colored text one at a time.
     
     Args:
         text: The original text
-        tokens: List of token bytes
-        output: Output stream (default: stdout)
+        token_positions: List of (start, end, token) tuples
+        charset: Encoding of the output stream
+        
+    Yields:
+        Encoded text, ANSI color codes and tokens in output order
     """
-    # If there are no tokens, just print the text
-    if not tokens:
-        print(text)
-        return
-    
-    # Convert tokens to strings and get their positions
-    token_positions: List[Tuple[int, int, str]] = get_token_positions(text, tokens)
-    
-    # Generate colored text
-    colored_text: str = ""
     last_end: int = 0
     
     for i, (start, end, token_str) in enumerate(token_positions):
         # If there's a gap between the last token and this one, add the text as-is
         if start > last_end:
-            colored_text += text[last_end:start]
+            yield text[last_end:start].encode(charset, errors='replace')
         
         # Add the colored token
-        color = BG_COLORS[i % len(BG_COLORS)]
-        colored_text += f"{color}{token_str}{RESET}"
+        yield BG_COLORS[i % len(BG_COLORS)]
+        yield token_str.encode(charset, errors='replace')
+        yield RESET
         last_end = end
     
     # Add any remaining text
     if last_end < len(text):
-        colored_text += text[last_end:]
+        yield text[last_end:].encode(charset, errors='replace')
+    yield b"\n"
+
+
+def visualize_tokens(text: str, tokens: List[bytes], output: Optional[TextIO]=None) -> None:
+    """Visualize tokens by coloring each token with a different background color.
+    
+    The colored text is streamed piece by piece, straight to the underlying
+    byte stream when the output has one, so it is never built up in memory.
+    
+    Args:
+        text: The original text
+        tokens: List of token bytes
+        output: Output stream (default: stdout)
+    """
+    if output is None:
+        output = sys.stdout
+    
+    # If there are no tokens, just print the text
+    if not tokens:
+        print(text, file=output)
+        return
+    
+    # Convert tokens to strings and get their positions
+    token_positions: List[Tuple[int, int, str]] = get_token_positions(text, tokens)
     
     # Print the header
     print(f"Tokens: {len(tokens)}        Characters: {len(text)}\n", file=output)
     
     # Print the colored text
-    print(colored_text, file=output)
+    charset: str = getattr(output, "encoding", None) or "utf-8"
+    pieces: Iterator[bytes] = _colored_pieces(text, token_positions, charset)
+    buffer: Optional[BinaryIO] = getattr(output, "buffer", None)
+    if buffer is not None:
+        output.flush()
+        write_bytes = buffer.write
+        for piece in pieces:
+            write_bytes(piece)
+    else:
+        write_text = output.write
+        for piece in pieces:
+            write_text(piece.decode(charset, errors='replace'))
     print("\n", file=output)
 
 
-def colorize_file(file_path: str, encoding: 'tiktoken.Encoding', output: Optional[TextIO]=sys.stdout) -> None:
+def colorize_file(file_path: str, encoding: 'tiktoken.Encoding', output: Optional[TextIO]=None) -> None:
     """Colorize tokens in a file.
     
     Args:
@@ -119,7 +174,7 @@ def colorize_file(file_path: str, encoding: 'tiktoken.Encoding', output: Optiona
             text: str = f.read()
         
         tokens: List[int] = encoding.encode(text)
-        token_bytes: List[bytes] = [encoding.decode_single_token_bytes(token) for token in tokens]
+        token_bytes: List[bytes] = decode_token_bytes(encoding, tokens)
         visualize_tokens(text, token_bytes, output)
     except FileNotFoundError:
         print(f"Error: File not found: {file_path}", file=sys.stderr)
@@ -1,8 +1,31 @@
 """Tests for the countgpt package."""
+import io
+import os
+import subprocess
+import sys
+import types
 import pytest
+import tiktoken
 from click.testing import CliRunner
+import countgpt.models
 from countgpt.cli import main
-from countgpt.models import count_tokens, count_tokens_in_file
+from countgpt.models import (
+    CHUNK_SIZE,
+    MMAP_THRESHOLD,
+    count_tokens,
+    count_tokens_batch,
+    count_tokens_bytes,
+    count_tokens_in_file,
+    count_tokens_in_files,
+    get_encoding,
+    iter_text_chunks,
+    _BpeOpenAIEncoder,
+    _count_cached,
+    _count_texts,
+    _get_counting_encoder,
+    _iter_buffer_chunks,
+)
+from countgpt.visualize import BG_COLORS, RESET, get_token_positions, visualize_tokens
 from pathlib import Path
 
 
@@ -42,6 +65,13 @@ def test_count_tokens_in_file(sample_file):
     assert result["characters"] > 0
     assert result["file"] == str(sample_file)
     assert result["model"] == "cl100k_base"
+    assert result.tokens == result["tokens"] == result[1]
+    assert result._asdict()["tokens"] == result.tokens
+    
+    # Only field names can be looked up, not the tuple's own attributes
+    for name in ("count", "index", "_fields", "_asdict", "missing"):
+        with pytest.raises(KeyError):
+            result[name]
     
     # Test with nonexistent file
     with pytest.raises(FileNotFoundError):
@@ -67,4 +97,303 @@ def test_cli():
     assert result.exit_code == 0
     assert "Model:" in result.output
     assert "Token count:" in result.output
-    assert "Character count:" in result.output
\ No newline at end of file
+    assert "Character count:" in result.output
+
+
+def test_get_encoding():
+    """Test that encodings are loaded from tiktoken once and then reused."""
+    encoding = get_encoding("cl100k_base")
+    assert encoding is get_encoding("cl100k_base")
+    assert encoding.encode("Hello, world!") == tiktoken.get_encoding("cl100k_base").encode("Hello, world!")
+    
+    with pytest.raises(ValueError):
+        get_encoding("invalid_encoding_name")
+
+
+def test_cli_multiple_files(tmp_path):
+    """Test counting tokens across several files."""
+    first = tmp_path / "first.txt"
+    first.write_text("Hello, world!")
+    second = tmp_path / "second.txt"
+    second.write_text("This is a test of token counting")
+    
+    runner = CliRunner()
+    result = runner.invoke(main, [str(first), str(second)])
+    assert result.exit_code == 0
+    
+    lines = result.output.strip().splitlines()
+    assert lines[0] == f"{first}: {count_tokens('Hello, world!')}"
+    assert lines[1] == f"{second}: {count_tokens('This is a test of token counting')}"
+    assert lines[2] == f"Total: {count_tokens('Hello, world!') + count_tokens('This is a test of token counting')}"
+    
+    # A file that can't be read is reported in its place and left out of the total
+    invalid = tmp_path / "invalid.txt"
+    invalid.write_bytes(b"\xff\xfe invalid")
+    result = runner.invoke(main, [str(first), str(invalid), str(second)])
+    assert result.exit_code == 0
+    lines = result.output.strip().splitlines()
+    assert lines[0] == f"{first}: {count_tokens('Hello, world!')}"
+    assert lines[1].startswith(f"Error reading {invalid}: Could not decode file.")
+    assert lines[2] == f"{second}: {count_tokens('This is a test of token counting')}"
+    assert lines[3] == f"Total: {count_tokens('Hello, world!') + count_tokens('This is a test of token counting')}"
+
+
+def test_iter_text_chunks():
+    """Test that chunked stdin-style reading yields the same token count."""
+    text = "Hello, world!\nThis is a test.\n\n  Indented line\nüñíçødé text\nlast line"
+    chunks = list(iter_text_chunks(io.BytesIO(text.encode('utf-8')), chunk_size=4))
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert sum(count_tokens(chunk) for chunk in chunks) == count_tokens(text)
+
+
+@pytest.fixture
+def o200k_like():
+    """An encoding with o200k_base's pre-tokenizer and a vocabulary merging across newlines."""
+    mergeable_ranks = {bytes([byte]): byte for byte in range(256)}
+    mergeable_ranks[b"\n/"] = 256
+    return tiktoken.Encoding(
+        "o200k_like",
+        pat_str=tiktoken.get_encoding("o200k_base")._pat_str,
+        mergeable_ranks=mergeable_ranks,
+        special_tokens={},
+    )
+
+
+def test_iter_text_chunks_o200k(o200k_like):
+    """Test that chunks never split a pre-token of o200k_base."""
+    text = "}\n// x \nabc\ndef\n;\n// y\n" * 40
+    chunks = list(iter_text_chunks(io.BytesIO(text.encode('utf-8')), chunk_size=16))
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert sum(len(o200k_like.encode_ordinary(chunk)) for chunk in chunks) == len(o200k_like.encode_ordinary(text))
+    
+    # The same holds with the real o200k_base vocabulary
+    text = "}\n// x \n" * 40 + "end\nstart\n" * 40
+    chunks = list(iter_text_chunks(io.BytesIO(text.encode('utf-8')), chunk_size=16))
+    assert sum(count_tokens(chunk, "gpt-4o") for chunk in chunks) == count_tokens(text, "gpt-4o")
+
+
+def test_get_token_positions():
+    """Test mapping token bytes back onto the original text."""
+    text = "Hello wörld"
+    tokens = [b"Hello", b" w", "ö".encode('utf-8'), b"rld"]
+    assert get_token_positions(text, tokens) == [
+        (0, 5, "Hello"),
+        (5, 7, " w"),
+        (7, 8, "ö"),
+        (8, 11, "rld"),
+    ]
+
+
+def test_visualize_tokens():
+    """Test the colored token output."""
+    output = io.StringIO()
+    visualize_tokens("Hello world", [b"Hello", b" world"], output)
+    assert output.getvalue() == (
+        "Tokens: 2        Characters: 11\n\n"
+        f"{BG_COLORS[0].decode()}Hello{RESET.decode()}{BG_COLORS[1].decode()} world{RESET.decode()}\n\n\n"
+    )
+
+
+def test_count_tokens_bytes():
+    """Test counting tokens in UTF-8 encoded bytes."""
+    text = "Hello, wörld!"
+    assert count_tokens_bytes(text.encode('utf-8')) == count_tokens(text)
+    
+    long_text = "Hello, world! " * 1000
+    assert count_tokens_bytes(long_text.encode('utf-8')) == count_tokens(long_text)
+    
+    with pytest.raises(UnicodeDecodeError):
+        count_tokens_bytes(b"\xff\xfe invalid")
+
+
+def test_cli_list_models():
+    """Test the model listing."""
+    runner = CliRunner()
+    result = runner.invoke(main, ["--list-models"])
+    assert result.exit_code == 0
+    assert "Available tokenizer models:" in result.output
+    assert "  cl100k_base\n" in result.output
+    assert "Anthropic Models:" in result.output
+    assert "  gpt-4 (uses cl100k_base)\n" in result.output
+
+
+def test_cli_visualize():
+    """Test the colorful visualization output."""
+    runner = CliRunner()
+    result = runner.invoke(main, ["-c"], input="Hello, world!")
+    assert result.exit_code == 0
+    assert result.output.startswith("Tokens: ")
+    assert RESET.decode() in result.output
+
+
+def test_count_tokens_batch(monkeypatch):
+    """Test counting several texts, including ones split across threads."""
+    texts = ["Hello, world!", "line one\nline two\n\n  indented\nlast line\n" * 50, ""]
+    expected = [count_tokens(text) for text in texts]
+    assert count_tokens_batch(texts) == expected
+    
+    # Force the large-text path so the split pieces are counted too
+    monkeypatch.setattr(countgpt.models, "PARALLEL_THRESHOLD", 16)
+    monkeypatch.setattr(countgpt.models.os, "cpu_count", lambda: 4)
+    assert count_tokens_batch(texts) == expected
+    
+    # Split points must not break up o200k_base pre-tokens either
+    texts = ["}\n// x \nabc\ndef\n" * 40]
+    assert count_tokens_batch(texts, "gpt-4o") == [count_tokens(texts[0], "gpt-4o")]
+
+
+def test_count_tokens_batch_o200k(monkeypatch, o200k_like):
+    """Test that texts split across threads keep o200k_base pre-tokens whole."""
+    monkeypatch.setattr(countgpt.models, "PARALLEL_THRESHOLD", 16)
+    monkeypatch.setattr(countgpt.models.os, "cpu_count", lambda: 4)
+    texts = ["}\n// x \nabc\ndef\n" * 40, "}\n// x \n" * 40]
+    assert _count_texts(o200k_like, texts) == [len(o200k_like.encode_ordinary(text)) for text in texts]
+
+
+def test_counting_backend_fallback(monkeypatch):
+    """Test that counting falls back to tiktoken when a backend is unavailable."""
+    monkeypatch.setitem(countgpt.models._ENCODER_BACKENDS, "cl100k_base", lambda name: None)
+    _get_counting_encoder.cache_clear()
+    try:
+        assert _get_counting_encoder("cl100k_base") is get_encoding("cl100k_base")
+    finally:
+        _get_counting_encoder.cache_clear()
+
+
+def test_bpe_openai_backend(monkeypatch):
+    """Test counting through the bpe-openai backend, using a stand-in for its extension."""
+    loaded = []
+    counted = []
+    
+    class Tokenizer:
+        def encode(self, text):
+            return list(range(len(text.split())))
+        
+        def count(self, text):
+            counted.append(text)
+            return len(text.split())
+    
+    def tokenizer_for_encoding(name):
+        loaded.append(name)
+        return Tokenizer()
+    
+    bindings = types.ModuleType("bpe_openai._bindings")
+    bindings.tokenizer_for_encoding = tokenizer_for_encoding
+    package = types.ModuleType("bpe_openai")
+    package._bindings = bindings
+    monkeypatch.setitem(sys.modules, "bpe_openai", package)
+    monkeypatch.setitem(sys.modules, "bpe_openai._bindings", bindings)
+    
+    _get_counting_encoder.cache_clear()
+    count_tokens.cache_clear()
+    try:
+        encoder = _get_counting_encoder("cl100k_base")
+        assert isinstance(encoder, _BpeOpenAIEncoder)
+        assert loaded == ["cl100k_base"]
+        assert encoder.encode_ordinary("one two") == [0, 1]
+        
+        assert count_tokens("one two three", "gpt-4") == 3
+        assert counted == ["one two three"]
+    finally:
+        _get_counting_encoder.cache_clear()
+        count_tokens.cache_clear()
+
+
+def test_count_tokens_cache():
+    """Test that short texts are counted once and then served from the cache."""
+    count_tokens.cache_clear()
+    first = count_tokens("Cached text", "cl100k_base")
+    assert count_tokens("Cached text", "cl100k_base") == first
+    assert _count_cached.cache_info().hits == 1
+    
+    count_tokens.cache_clear()
+    assert _count_cached.cache_info().currsize == 0
+
+
+def test_count_tokens_in_files(tmp_path, monkeypatch):
+    """Test counting tokens in several files with their chunks batched together."""
+    # Use small chunks and batches so the files span several of each
+    monkeypatch.setattr(countgpt.models, "iter_text_chunks", lambda stream: iter_text_chunks(stream, 64))
+    monkeypatch.setattr(countgpt.models, "BATCH_CHUNKS", 2)
+    texts = ["Hello, world!\nSecond line here.\n" * 20, "Short file", "wörld\n" * 50]
+    paths = []
+    for index, text in enumerate(texts):
+        path = tmp_path / f"file{index}.txt"
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    
+    results = count_tokens_in_files(paths)
+    assert [result["file"] for result in results] == [str(path) for path in paths]
+    assert [result["tokens"] for result in results] == [count_tokens(text) for text in texts]
+    assert [result["characters"] for result in results] == [len(text) for text in texts]
+
+
+def test_cli_help_skips_tiktoken():
+    """Test that importing the CLI and showing help don't load tiktoken."""
+    code = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from countgpt.cli import main\n"
+        "assert CliRunner().invoke(main, ['--help']).exit_code == 0\n"
+        "assert 'tiktoken' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_native_count():
+    """Test that an encoder's native count_ordinary is used when it has one."""
+    class CountingEncoder:
+        def encode_ordinary(self, text):
+            raise AssertionError("token list should not be built")
+        
+        def count_ordinary(self, text):
+            return len(text.split())
+    
+    assert _count_texts(CountingEncoder(), ["one two three"]) == [3]
+    assert _count_texts(CountingEncoder(), ["one two", "three", ""]) == [2, 1, 0]
+
+
+def test_count_tokens_in_mapped_file(tmp_path, o200k_like):
+    """Test counting tokens in a file large enough to be memory-mapped and split."""
+    line = "Hello, wörld!\nline two\n\n  indented\nlast line\n"
+    text = line * (CHUNK_SIZE // len(line) + 1000)
+    path = tmp_path / "mapped.txt"
+    path.write_text(text, encoding="utf-8")
+    assert path.stat().st_size > max(CHUNK_SIZE, MMAP_THRESHOLD)
+    result = count_tokens_in_file(path)
+    assert result["tokens"] == count_tokens(text)
+    assert result["characters"] == len(text)
+    
+    # Pieces must keep o200k_base pre-tokens such as "}\n//" whole
+    line = "}\n// x \nabc\ndef\n"
+    text = line * (CHUNK_SIZE // len(line) + 1000)
+    path = tmp_path / "mapped_o200k.txt"
+    path.write_text(text, encoding="utf-8")
+    assert count_tokens_in_file(path, "gpt-4o")["tokens"] == count_tokens(text, "gpt-4o")
+    
+    text = line * 40
+    pieces = list(_iter_buffer_chunks(text.encode("utf-8"), 64))
+    assert len(pieces) > 1
+    assert "".join(pieces) == text
+    assert sum(len(o200k_like.encode_ordinary(piece)) for piece in pieces) == len(o200k_like.encode_ordinary(text))
+
+
+def test_count_tokens_in_file_cache(tmp_path):
+    """Test that unchanged files are served from the cache and changed ones are recounted."""
+    path = tmp_path / "cached.txt"
+    path.write_text("Hello world", encoding="utf-8")
+    count_tokens_in_file.cache_clear()
+    first = count_tokens_in_file(path)
+    assert first.tokens != count_tokens("Hello test!")
+    
+    # New contents with the same size and modification time are not read again
+    status = path.stat()
+    path.write_text("Hello test!", encoding="utf-8")
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns))
+    assert count_tokens_in_file(path) == first
+    
+    # A new modification time makes the file count again
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 1))
+    assert count_tokens_in_file(path).tokens == count_tokens("Hello test!")